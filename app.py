@@ -1,7 +1,8 @@
+import base64
 import os
-import random
-import string
+import time as _time
 from contextlib import closing
+from functools import lru_cache
 from datetime import date, datetime, time, timedelta
 from decimal import Decimal, ROUND_HALF_UP
 
@@ -15,7 +16,7 @@ from flask import (
 )
 from mysql.connector import Error
 
-from db_config import get_db_connection
+from db_config import get_booking_connection, get_db_connection
 
 
 class DatabaseError(RuntimeError):
@@ -29,15 +30,21 @@ class DomainError(RuntimeError):
 app = Flask(__name__)
 app.secret_key = os.getenv("FLASK_SECRET_KEY", "railway-dev-secret")
 
+# Stations and coach types are seeded once and rarely change, so they are
+# served from memory and refreshed at most once per window. A value of zero
+# or less disables the cache.
+REFERENCE_CACHE_TTL_SECONDS = int(os.getenv("REFERENCE_CACHE_TTL", "60"))
+
 
 # ---------------------------------------------------------------------------
 # Helper utilities
 # ---------------------------------------------------------------------------
 
 
-def _generate_pnr(booking_id: int) -> str:
-    suffix = ''.join(random.choices(string.ascii_uppercase + string.digits, k=5))
-    return f"PNR{booking_id:04d}{suffix}"
+def _generate_pnr_suffix() -> str:
+    # The "PNR" prefix and zero-padded booking id are added server-side in
+    # _CREATE_BOOKING_BATCH, since the id is not known before the insert.
+    return base64.b32encode(os.urandom(4)).decode()[:5]
 
 
 def _to_decimal(value) -> Decimal:
@@ -46,24 +53,46 @@ def _to_decimal(value) -> Decimal:
     return Decimal(str(value))
 
 
+def _to_float(value) -> float:
+    if isinstance(value, (Decimal, int, float)):
+        return float(value)
+    return float(Decimal(str(value)))
+
+
 def _compute_fare_amount(base, multiplier) -> Decimal:
     amount = _to_decimal(base) * _to_decimal(multiplier)
     return amount.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
 
 
+def _apply_fare(row: dict) -> dict:
+    fare_decimal = _compute_fare_amount(row["base_fare"], row["fare_multiplier"])
+    row["fare_amount"] = fare_decimal
+    row["fare_display"] = format(fare_decimal, ".2f")
+    return row
+
+
 def _coerce_date(value):
     if isinstance(value, datetime):
         return value.date()
     return value
 
 
+_SECONDS_PER_MINUTE = 60
+_SECONDS_PER_HOUR = 3600
+_SECONDS_PER_DAY = 24 * _SECONDS_PER_HOUR
+
+
+@lru_cache(maxsize=4096)
+def _seconds_to_time(total_seconds: int) -> time:
+    # Timetables reuse the same departure/arrival times, so this hits the cache.
+    hours, remainder = divmod(total_seconds, _SECONDS_PER_HOUR)
+    minutes, seconds = divmod(remainder, _SECONDS_PER_MINUTE)
+    return time(hour=hours, minute=minutes, second=seconds)
+
+
 def _coerce_time(value):
     if isinstance(value, timedelta):
-        total_seconds = int(value.total_seconds()) % (24 * 3600)
-        hours = total_seconds // 3600
-        minutes = (total_seconds % 3600) // 60
-        seconds = total_seconds % 60
-        return time(hour=hours, minute=minutes, second=seconds)
+        return _seconds_to_time(int(value.total_seconds()) % _SECONDS_PER_DAY)
     return value
 
 
@@ -76,6 +105,16 @@ def _normalize_schedule_row(row: dict | None):
     return row
 
 
+def _normalize_schedule_rows(rows: list[dict]):
+    coerce_date = _coerce_date
+    coerce_time = _coerce_time
+    for row in rows:
+        row["travel_date"] = coerce_date(row["travel_date"])
+        row["departure_time"] = coerce_time(row["departure_time"])
+        row["arrival_time"] = coerce_time(row["arrival_time"])
+    return rows
+
+
 def _normalize_booking_row(row: dict | None):
     if not row:
         return row
@@ -84,40 +123,59 @@ def _normalize_booking_row(row: dict | None):
     row["arrival_time"] = _coerce_time(row.get("arrival_time"))
     fare_amount = row.get("fare_amount")
     if fare_amount is not None:
-        row["fare_amount"] = float(_to_decimal(fare_amount))
+        row["fare_amount"] = _to_float(fare_amount)
     for numeric_key in ("base_fare", "fare_multiplier"):
         if numeric_key in row and row[numeric_key] is not None:
-            row[numeric_key] = float(_to_decimal(row[numeric_key]))
+            row[numeric_key] = _to_float(row[numeric_key])
     return row
 
 
-def _fetch_all(query: str, params: tuple | list | None = None):
+def _fetch_all(
+    query: str,
+    params: tuple | list | None = None,
+    keys: tuple[str, ...] | None = None,
+):
+    """Run a read query and return its rows as dicts.
+
+    When ``keys`` is given, rows are read as tuples and zipped into dicts with
+    those keys (in SELECT order), which is cheaper than a dictionary cursor.
+    """
     params = params or tuple()
     try:
         with closing(get_db_connection()) as conn:
-            cursor = conn.cursor(dictionary=True)
+            cursor = conn.cursor(dictionary=keys is None)
             cursor.execute(query, params)
             rows = cursor.fetchall()
             cursor.close()
-            return rows
     except Error as exc:
         raise DatabaseError(str(exc)) from exc
+    if keys is None:
+        return rows
+    return [dict(zip(keys, row)) for row in rows]
 
 
-def _fetch_one(query: str, params: tuple | list | None = None):
-    params = params or tuple()
-    try:
-        with closing(get_db_connection()) as conn:
-            cursor = conn.cursor(dictionary=True)
-            cursor.execute(query, params)
-            row = cursor.fetchone()
-            cursor.close()
-            return row
-    except Error as exc:
-        raise DatabaseError(str(exc)) from exc
+def _fetch_one(
+    query: str,
+    params: tuple | list | None = None,
+    keys: tuple[str, ...] | None = None,
+):
+    rows = _fetch_all(query, params, keys)
+    return rows[0] if rows else None
 
 
-def fetch_stations():
+def _ttl_bucket() -> int:
+    return int(_time.time() // REFERENCE_CACHE_TTL_SECONDS)
+
+
+def _reference_lookup(cached):
+    # A TTL of zero or less turns the cache off: query on every call.
+    if REFERENCE_CACHE_TTL_SECONDS <= 0:
+        return cached.__wrapped__(0)
+    return cached(_ttl_bucket())
+
+
+@lru_cache(maxsize=1)
+def _cached_stations(ttl_bucket: int):
     return _fetch_all(
         """
         SELECT id AS station_id, name AS station_name
@@ -127,7 +185,10 @@ def fetch_stations():
     )
 
 
-def fetch_coach_types():
+@lru_cache(maxsize=1)
+def _cached_coach_types(ttl_bucket: int):
+    # The cheapest fare is derived from the same rows, so the pair is always
+    # consistent and expires together.
     rows = _fetch_all(
         """
     SELECT id, code, name, base_fare, fare_multiplier, description
@@ -135,13 +196,22 @@ def fetch_coach_types():
         ORDER BY base_fare
         """
     )
-    result = []
-    for row in rows:
-        fare_decimal = _compute_fare_amount(row["base_fare"], row["fare_multiplier"])
-        row["fare_amount"] = fare_decimal
-        row["fare_display"] = format(fare_decimal, ".2f")
-        result.append(row)
-    return result
+    coach_types = [_apply_fare(row) for row in rows]
+    min_fare = min((ct["fare_amount"] for ct in coach_types), default=None)
+    return coach_types, min_fare
+
+
+def fetch_stations():
+    return _reference_lookup(_cached_stations)
+
+
+def fetch_coach_types():
+    coach_types, _ = _reference_lookup(_cached_coach_types)
+    return coach_types
+
+
+def fetch_coach_types_with_min_fare():
+    return _reference_lookup(_cached_coach_types)
 
 
 def get_coach_type(coach_type_id: int):
@@ -154,12 +224,23 @@ def get_coach_type(coach_type_id: int):
         (coach_type_id,),
     )
     if row:
-        fare_decimal = _compute_fare_amount(row["base_fare"], row["fare_multiplier"])
-        row["fare_amount"] = fare_decimal
-        row["fare_display"] = format(fare_decimal, ".2f")
+        _apply_fare(row)
     return row
 
 
+_SCHEDULE_KEYS: tuple[str, ...] = (
+    "schedule_id",
+    "travel_date",
+    "departure_time",
+    "arrival_time",
+    "available_seats",
+    "train_name",
+    "train_number",
+    "source_name",
+    "destination_name",
+)
+
+
 def search_schedules(source_id: int, destination_id: int, travel_date: date):
     rows = _fetch_all(
         """
@@ -183,8 +264,9 @@ def search_schedules(source_id: int, destination_id: int, travel_date: date):
         ORDER BY s.departure_time
         """,
         (source_id, destination_id, travel_date),
+        _SCHEDULE_KEYS,
     )
-    return [_normalize_schedule_row(row) for row in rows]
+    return _normalize_schedule_rows(rows)
 
 
 def get_schedule(schedule_id: int):
@@ -207,11 +289,12 @@ def get_schedule(schedule_id: int):
         WHERE s.id = %s
         """,
         (schedule_id,),
+        _SCHEDULE_KEYS,
     )
     return _normalize_schedule_row(row)
 
 
-def get_booking_overview(booking_id: int):
+def get_booking_overview_by_id_and_pnr(booking_id: int, pnr: str):
     row = _fetch_one(
         """
         SELECT
@@ -239,12 +322,13 @@ def get_booking_overview(booking_id: int):
         JOIN ticket tk ON tk.booking_id = b.id
         JOIN schedule s ON b.schedule_id = s.id
         JOIN train t ON s.train_id = t.id
-    JOIN coachtype ct ON b.coach_type_id = ct.id
+        JOIN coachtype ct ON b.coach_type_id = ct.id
         JOIN station src ON s.source_station_id = src.id
         JOIN station dest ON s.destination_station_id = dest.id
         WHERE b.id = %s
+          AND tk.pnr = %s
         """,
-        (booking_id,),
+        (booking_id, pnr),
     )
     return _normalize_booking_row(row)
 
@@ -287,48 +371,63 @@ def get_ticket(pnr: str):
     return _normalize_booking_row(row)
 
 
+# Claims a seat, inserts the booking and its ticket, and reads them back in one
+# round trip. LAST_INSERT_ID is reset to 0 first and threaded through each
+# statement: the UPDATE sets it to the pre-decrement seat count, the booking
+# INSERT to the new booking id, and the ticket INSERT to the ticket id. When no
+# seat is claimed it stays 0, so the later statements insert and return nothing.
+_CREATE_BOOKING_BATCH = """
+DO LAST_INSERT_ID(0);
+UPDATE schedule
+SET available_seats = LAST_INSERT_ID(available_seats) - 1
+WHERE id = %s AND available_seats > 0;
+INSERT INTO booking (schedule_id, coach_type_id, passenger_name, email, status, seat_number, fare_amount)
+SELECT %s, %s, %s, %s, 'PENDING',
+    CONCAT('S', LPAD(LAST_INSERT_ID(), GREATEST(3, CHAR_LENGTH(LAST_INSERT_ID())), '0')),
+    %s
+FROM DUAL
+WHERE LAST_INSERT_ID() > 0;
+INSERT INTO ticket (booking_id, pnr)
+SELECT LAST_INSERT_ID(),
+    CONCAT('PNR', LPAD(LAST_INSERT_ID(), GREATEST(4, CHAR_LENGTH(LAST_INSERT_ID())), '0'), %s)
+FROM DUAL
+WHERE LAST_INSERT_ID() > 0;
+SELECT b.id, tk.pnr, b.seat_number
+FROM ticket tk
+JOIN booking b ON tk.booking_id = b.id
+WHERE tk.id = LAST_INSERT_ID()
+"""
+
+
 def create_booking(schedule_id: int, coach_type_id: int, passenger_name: str, email: str, fare_amount: Decimal):
     conn = None
     cursor = None
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute(
-            "SELECT id, available_seats FROM schedule WHERE id = %s FOR UPDATE",
-            (schedule_id,),
+        conn = get_booking_connection()
+        cursor = conn.cursor()
+        params = (
+            schedule_id,
+            schedule_id,
+            coach_type_id,
+            passenger_name,
+            email,
+            fare_amount,
+            _generate_pnr_suffix(),
         )
-        schedule = cursor.fetchone()
-        if not schedule:
-            raise DomainError("Schedule not found")
-        if schedule["available_seats"] <= 0:
+        created = None
+        # execute(..., multi=True) was removed in mysql-connector-python 9.2;
+        # this relies on the 9.0 pin in requirements.txt.
+        for result in cursor.execute(_CREATE_BOOKING_BATCH, params, multi=True):
+            if result.with_rows:
+                created = result.fetchone()
+
+        if not created:
+            cursor.execute("SELECT id FROM schedule WHERE id = %s", (schedule_id,))
+            if not cursor.fetchone():
+                raise DomainError("Schedule not found")
             raise DomainError("No seats left for this schedule")
 
-        seat_number = f"S{schedule['available_seats']:03d}"
-
-        cursor.execute(
-            """
-            UPDATE schedule
-            SET available_seats = available_seats - 1
-            WHERE id = %s
-            """,
-            (schedule_id,),
-        )
-
-        cursor.execute(
-            """
-            INSERT INTO booking (schedule_id, coach_type_id, passenger_name, email, status, seat_number, fare_amount)
-            VALUES (%s, %s, %s, %s, %s, %s, %s)
-            """,
-            (schedule_id, coach_type_id, passenger_name, email, "PENDING", seat_number, fare_amount),
-        )
-        booking_id = cursor.lastrowid
-        pnr = _generate_pnr(booking_id)
-
-        cursor.execute(
-            "INSERT INTO ticket (booking_id, pnr) VALUES (%s, %s)",
-            (booking_id, pnr),
-        )
-
+        booking_id, pnr, seat_number = created
         conn.commit()
         return booking_id, pnr, seat_number
     except DomainError:
@@ -363,6 +462,7 @@ def record_payment(booking_id: int, success: bool, method: str = "CARD", amount:
     cursor = None
     try:
         conn = get_db_connection()
+        conn.start_transaction()
         cursor = conn.cursor()
         booking_status = "CONFIRMED" if success else "FAILED"
         payment_status = "SUCCESS" if success else "FAILED"
@@ -421,14 +521,16 @@ def search():
         abort(400, description="Source, destination, and travel date are required.")
 
     try:
-        travel_date = datetime.strptime(travel_date_raw, "%Y-%m-%d").date()
+        travel_date = date.fromisoformat(travel_date_raw)
     except ValueError:
         abort(400, description="Invalid travel date format.")
 
     try:
+        # Schedules are the only uncached query, so they go first: if they fail,
+        # the error page is rendered without touching the reference data.
         schedules = search_schedules(int(source_id), int(destination_id), travel_date)
         stations = fetch_stations()
-        coach_types = fetch_coach_types()
+        coach_types, min_fare = fetch_coach_types_with_min_fare()
     except DatabaseError as exc:
         return render_template(
             "results.html",
@@ -441,10 +543,6 @@ def search():
             error=str(exc),
         ), 500
 
-    min_fare = None
-    if coach_types:
-        min_fare = min(_to_decimal(ct["fare_amount"]) for ct in coach_types)
-
     return render_template(
         "results.html",
         schedules=schedules,
@@ -507,7 +605,7 @@ def book(schedule_id: int):
                 selected_coach_id=coach_type_raw,
             ), 400
 
-        coach = get_coach_type(coach_type_id)
+        coach = next((ct for ct in coach_types if ct["id"] == coach_type_id), None)
         if not coach:
             return render_template(
                 "booking.html",
@@ -558,11 +656,11 @@ def payment_page():
         abort(400, description="Missing booking details")
 
     try:
-        booking = get_booking_overview(int(booking_id))
+        booking = get_booking_overview_by_id_and_pnr(int(booking_id), pnr)
     except DatabaseError as exc:
         return render_template("payment.html", booking=None, error=str(exc)), 500
 
-    if not booking or booking.get("pnr") != pnr:
+    if not booking:
         abort(404, description="Booking not found")
 
     return render_template("payment.html", booking=booking, error=None)
@@ -583,19 +681,15 @@ def pay():
         abort(400, description="Invalid booking identifier")
 
     try:
-        booking = get_booking_overview(booking_id)
+        booking = get_booking_overview_by_id_and_pnr(booking_id, pnr)
     except DatabaseError as exc:
         return render_template("payment.html", booking=None, error=str(exc)), 500
 
-    if not booking or booking.get("pnr") != pnr:
+    if not booking:
         abort(404, description="Booking not found")
 
-    success = True
-    try:
-        if int(card[-1]) % 2 == 1:
-            success = False
-    except (ValueError, IndexError):
-        success = False
+    # Simulated gateway: a card ending in an even digit succeeds.
+    success = card[-1] in "02468"
 
     try:
         status = record_payment(booking_id, success, amount=booking["fare_amount"])
@@ -0,0 +1,82 @@
+"""Database connection settings and the shared MySQL connection pools."""
+
+from __future__ import annotations
+
+import os
+import threading
+
+import mysql.connector
+from mysql.connector import errors, pooling
+from mysql.connector.constants import ClientFlag
+
+DB_CONFIG: dict[str, object] = {
+    "host": os.getenv("DB_HOST", "localhost"),
+    "port": int(os.getenv("DB_PORT", "3306")),
+    "user": os.getenv("DB_USER", "root"),
+    "password": os.getenv("DB_PASSWORD", ""),
+    "database": os.getenv("DB_NAME", "railway"),
+}
+
+# Size this to the number of concurrent request threads the WSGI server runs.
+# Requests beyond it still work but pay for a fresh, unpooled connection.
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+BOOKING_POOL_SIZE = int(os.getenv("DB_BOOKING_POOL_SIZE", "4"))
+
+# The connector enables multi-statement execution by default. It is switched
+# off for general use and only allowed on the booking pool, whose sole caller
+# is create_booking's fixed statement batch.
+POOL_CLIENT_FLAGS = [-ClientFlag.MULTI_STATEMENTS]
+BOOKING_CLIENT_FLAGS = [ClientFlag.MULTI_STATEMENTS, ClientFlag.MULTI_RESULTS]
+
+_pools: dict[str, pooling.MySQLConnectionPool] = {}
+_pool_lock = threading.Lock()
+
+
+def _get_pool(name: str, size: int, **options) -> pooling.MySQLConnectionPool:
+    pool = _pools.get(name)
+    if pool is None:
+        with _pool_lock:
+            pool = _pools.get(name)
+            if pool is None:
+                # pool_reset_session=False skips the session reset round trip on
+                # every checkout (the connector still pings to check liveness).
+                # No transaction may therefore be left open on close(): the
+                # general pool autocommits, so plain reads never open one, and
+                # writers commit or roll back their explicit transactions.
+                pool = pooling.MySQLConnectionPool(
+                    pool_name=name,
+                    pool_size=size,
+                    pool_reset_session=False,
+                    **options,
+                    **DB_CONFIG,
+                )
+                _pools[name] = pool
+    return pool
+
+
+def _checkout(name: str, size: int, **options):
+    # get_connection() raises instead of waiting when every pooled connection
+    # is in use, so an exhausted pool overflows to a direct connection that is
+    # closed, not pooled, when the caller is done with it.
+    try:
+        return _get_pool(name, size, **options).get_connection()
+    except errors.PoolError:
+        return get_direct_connection(**options)
+
+
+def get_direct_connection(**overrides):
+    """Open an unpooled connection, e.g. for one-shot scripts such as init_db."""
+    return mysql.connector.connect(**{**DB_CONFIG, **overrides})
+
+
+def get_db_connection():
+    """Check out an autocommit connection; ``close()`` returns it to the pool.
+
+    Writes spanning several statements must call ``start_transaction()``.
+    """
+    return _checkout("rail", POOL_SIZE, client_flags=POOL_CLIENT_FLAGS, autocommit=True)
+
+
+def get_booking_connection():
+    """Check out a connection that accepts multi-statement batches."""
+    return _checkout("rail_booking", BOOKING_POOL_SIZE, client_flags=BOOKING_CLIENT_FLAGS)
@@ -3,10 +3,11 @@
 from __future__ import annotations
 
 from datetime import date, timedelta
+from itertools import chain
 
 from mysql.connector import Error
 
-from db_config import get_db_connection
+from db_config import get_direct_connection
 
 EXPECTED_COLUMNS: dict[str, set[str]] = {
     "schedule": {
@@ -54,6 +55,19 @@ EXPECTED_COLUMNS: dict[str, set[str]] = {
     },
 }
 
+EXPECTED_INDEXES: dict[str, dict[str, tuple[str, ...]]] = {
+    "schedule": {
+        "idx_schedule_search": (
+            "source_station_id",
+            "destination_station_id",
+            "travel_date",
+            "departure_time",
+        ),
+    },
+}
+
+REFERENCE_TABLES: tuple[str, ...] = ("station", "train", "coachtype")
+
 DROP_ORDER: tuple[str, ...] = (
     "payment",
     "ticket",
@@ -101,6 +115,7 @@ SCHEMA_STATEMENTS = [
         departure_time TIME NOT NULL,
         arrival_time TIME NOT NULL,
         available_seats INT NOT NULL DEFAULT 100,
+        KEY idx_schedule_search (source_station_id, destination_station_id, travel_date, departure_time),
         FOREIGN KEY (train_id) REFERENCES train(id) ON DELETE CASCADE,
         FOREIGN KEY (source_station_id) REFERENCES station(id) ON DELETE RESTRICT,
         FOREIGN KEY (destination_station_id) REFERENCES station(id) ON DELETE RESTRICT
@@ -168,6 +183,26 @@ def ensure_schema(cursor) -> None:
         cursor.execute(statement)
 
 
+def get_existing_indexes(cursor, table_name: str) -> set[str]:
+    try:
+        cursor.execute(f"SHOW INDEX FROM `{table_name}`")
+    except Error:
+        return set()
+    rows = cursor.fetchall()
+    return {row[2] for row in rows}
+
+
+def ensure_indexes(cursor) -> None:
+    """Add indexes missing from tables created before they were declared."""
+    for table, indexes in EXPECTED_INDEXES.items():
+        existing = get_existing_indexes(cursor, table)
+        for index_name, columns in indexes.items():
+            if index_name in existing:
+                continue
+            column_list = ", ".join(f"`{column}`" for column in columns)
+            cursor.execute(f"CREATE INDEX `{index_name}` ON `{table}` ({column_list})")
+
+
 def get_existing_columns(cursor, table_name: str) -> set[str]:
     try:
         cursor.execute(f"SHOW COLUMNS FROM `{table_name}`")
@@ -195,22 +230,37 @@ def drop_conflicting_tables(cursor) -> None:
     return
 
 
+def insert_rows(cursor, insert_prefix: str, rows: list[tuple]) -> None:
+    """Insert all rows with a single multi-row ``VALUES (...), (...)`` statement."""
+    if not rows:
+        return
+    placeholders = "(" + ", ".join(["%s"] * len(rows[0])) + ")"
+    sql = f"{insert_prefix} VALUES " + ", ".join([placeholders] * len(rows))
+    cursor.execute(sql, tuple(chain.from_iterable(rows)))
+
+
+def get_empty_tables(cursor, table_names: tuple[str, ...]) -> set[str]:
+    """Return the subset of ``table_names`` that hold no rows, in one round trip."""
+    query = " UNION ALL ".join(
+        f"SELECT '{name}', EXISTS(SELECT 1 FROM `{name}`)" for name in table_names
+    )
+    cursor.execute(query)
+    return {name for name, has_rows in cursor.fetchall() if not has_rows}
+
+
 def seed_reference_data(cursor) -> None:
-    cursor.execute("SELECT COUNT(*) FROM station")
-    (station_count,) = cursor.fetchone()
-    if station_count == 0:
-        cursor.executemany("INSERT INTO station (code, name) VALUES (%s, %s)", SAMPLE_STATIONS)
-
-    cursor.execute("SELECT COUNT(*) FROM train")
-    (train_count,) = cursor.fetchone()
-    if train_count == 0:
-        cursor.executemany("INSERT INTO train (number, name) VALUES (%s, %s)", SAMPLE_TRAINS)
-
-    cursor.execute("SELECT COUNT(*) FROM coachtype")
-    (coach_type_count,) = cursor.fetchone()
-    if coach_type_count == 0:
-        cursor.executemany(
-            "INSERT INTO coachtype (code, name, base_fare, fare_multiplier, description) VALUES (%s, %s, %s, %s, %s)",
+    empty_tables = get_empty_tables(cursor, REFERENCE_TABLES)
+
+    if "station" in empty_tables:
+        insert_rows(cursor, "INSERT INTO station (code, name)", SAMPLE_STATIONS)
+
+    if "train" in empty_tables:
+        insert_rows(cursor, "INSERT INTO train (number, name)", SAMPLE_TRAINS)
+
+    if "coachtype" in empty_tables:
+        insert_rows(
+            cursor,
+            "INSERT INTO coachtype (code, name, base_fare, fare_multiplier, description)",
             SAMPLE_COACH_TYPES,
         )
 
@@ -228,7 +278,8 @@ def seed_schedules(cursor) -> None:
         (2, 2, 1, today + timedelta(days=2), "16:45:00", "09:30:00", 90),
         (3, 4, 1, today + timedelta(days=3), "21:15:00", "07:10:00", 110),
     ]
-    cursor.executemany(
+    insert_rows(
+        cursor,
         """
         INSERT INTO schedule (
             train_id,
@@ -238,16 +289,14 @@ def seed_schedules(cursor) -> None:
             departure_time,
             arrival_time,
             available_seats
-        ) VALUES (%s, %s, %s, %s, %s, %s, %s)
-        """,
+        )""",
         sample_rows,
     )
 
 
 def main() -> None:
     try:
-        conn = get_db_connection()
-        conn.raise_on_warnings = False
+        conn = get_direct_connection(raise_on_warnings=False)
     except Error as exc:
         raise SystemExit(f"Unable to connect to database: {exc}")
 
@@ -261,6 +310,7 @@ def main() -> None:
             return
 
         ensure_schema(cursor)
+        ensure_indexes(cursor)
         seed_reference_data(cursor)
         seed_schedules(cursor)
         conn.commit()